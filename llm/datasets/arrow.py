@@ -0,0 +1,98 @@
+"""Memory-mapped Arrow IPC dataset provider.
+
+Shards stored in the Arrow IPC file format can be memory-mapped rather than
+read into memory so loading a shard is nearly instant and the pages of a
+shard are shared, via the OS page cache, between all processes reading the
+shard.
+"""
+
+from __future__ import annotations
+
+import pathlib
+from collections.abc import Iterable
+from typing import Any
+
+import pyarrow as pa
+from torch.utils.data import Dataset
+
+from llm.datasets.sharded import DatasetParams
+
+
+class ArrowDataset(Dataset[dict[str, Any]]):
+    """Memory-mapped Arrow IPC file dataset.
+
+    Like the PyTorch [`Dataset`][torch.utils.data.Dataset], this dataset is
+    indexable returning a dictionary mapping each column name of the table
+    to the value of the column in that row.
+
+    Example:
+        ```python
+        >>> from llm.datasets.arrow import ArrowDataset
+        >>> dataset = ArrowDataset('/path/to/shard.arrow')
+        >>> dataset[5]
+        {'input_ids': [...], ...}
+        ```
+
+    Args:
+        input_file: Arrow IPC file to memory-map.
+    """
+
+    def __init__(self, input_file: pathlib.Path | str) -> None:
+        self.input_file = input_file
+
+        self._source = pa.memory_map(str(input_file), 'r')
+        # Reading the table from a memory-mapped file is zero-copy so the
+        # data is only paged in from disk when accessed.
+        self._table = pa.ipc.open_file(self._source).read_all()
+
+    @classmethod
+    def length_from_params(cls, input_file: pathlib.Path | str) -> int:
+        """Get the number of rows from the file metadata."""
+        with pa.memory_map(str(input_file), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(
+                reader.get_batch(i).num_rows
+                for i in range(reader.num_record_batches)
+            )
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        if not (0 <= index < len(self)):
+            raise IndexError(
+                f'Requested sample index {index} exceeds dataset size of '
+                f'{len(self)} samples.',
+            )
+        return self._table.slice(index, 1).to_pylist()[0]
+
+    def __getitems__(self, indices: list[int]) -> list[dict[str, Any]]:
+        return self._table.take(indices).to_pylist()
+
+
+def arrow_shard_params(
+    input_files: Iterable[pathlib.Path | str],
+) -> dict[str, DatasetParams]:
+    """Get the shard parameters for a set of Arrow IPC files.
+
+    Example:
+        ```python
+        >>> from llm.datasets.arrow import ArrowDataset
+        >>> from llm.datasets.arrow import arrow_shard_params
+        >>> from llm.datasets.sharded import DistributedShardedDataset
+        >>> params = arrow_shard_params(['/path/to/shard-0.arrow', ...])
+        >>> dataset = DistributedShardedDataset(
+        ...     ArrowDataset, params, rank=0, world_size=1,
+        ... )
+        ```
+
+    Args:
+        input_files: Arrow IPC files where each file is a shard.
+
+    Returns:
+        Mapping of shard key to the parameters of an \
+        [`ArrowDataset`][llm.datasets.arrow.ArrowDataset] which can be \
+        passed to a \
+        [`DistributedShardedDataset`][llm.datasets.sharded.DistributedShardedDataset].
+    """
+    return {str(f): ((str(f),), {}) for f in input_files}
@@ -169,6 +169,11 @@ class NvidiaBertDataset(Dataset[Sample]):
             next_sentence_label=next_sentence_label_,
         )
 
+    def preload(self) -> None:
+        """Load the shard data if it has not already been loaded."""
+        if not self.loaded:
+            self._lazy_load()
+
     def _lazy_load(self) -> None:
         with h5py.File(self.input_file, 'r') as f:
             self.input_ids = f['input_ids'][:]
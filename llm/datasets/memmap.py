@@ -0,0 +1,135 @@
+"""Memory-mapped token ID dataset provider.
+
+Shards are flat binary files of token IDs (e.g., written with NumPy's
+`ndarray.tofile()`) where every `block_size` consecutive tokens form one
+sample. Shards are memory-mapped read-only so the pages of a shard are
+shared, via the OS page cache, between all processes (e.g.,
+[`DataLoader`][torch.utils.data.DataLoader] workers) reading the shard
+rather than each process holding a private copy.
+
+Example:
+    The shard parameters for a
+    [`DistributedShardedDataset`][llm.datasets.sharded.DistributedShardedDataset]
+    of memory-mapped shards can be constructed as:
+    ```python
+    >>> from llm.datasets.memmap import MemmapDataset
+    >>> from llm.datasets.sharded import DistributedShardedDataset
+    >>> params = {
+    ...     path: ((path,), {'block_size': 1024}) for path in files
+    ... }
+    >>> dataset = DistributedShardedDataset(
+    ...     MemmapDataset, params, rank=0, world_size=1,
+    ... )
+    ```
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+from typing import Any
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+
+class MemmapDataset(Dataset[dict[str, torch.Tensor]]):
+    """Memory-mapped token ID dataset.
+
+    Like the PyTorch [`Dataset`][torch.utils.data.Dataset], this dataset is
+    indexable returning a dictionary with the `input_ids` of the sample.
+
+    Example:
+        ```python
+        >>> from llm.datasets.memmap import MemmapDataset
+        >>> dataset = MemmapDataset('/path/to/shard.bin', block_size=1024)
+        >>> dataset[5]
+        {'input_ids': tensor([...])}
+        ```
+
+    By default, samples are copied out of the memory map into new int64
+    tensors. With `copy=False`, samples are instead zero-copy views of the
+    memory map with the data type of the file. The
+    [`DataLoader`][torch.utils.data.DataLoader] collates the samples into a
+    new tensor (within the worker process when `num_workers > 0`) so the
+    views are never copied until the whole batch is collated. The map is
+    copy-on-write in this case so modifying a sample in place only modifies
+    a private copy of the page and never the file. The token IDs will need
+    to be converted to int64 (e.g., after copying the batch to the device)
+    for use as labels.
+
+    Note:
+        Tensors sent between processes are shared via the sharing strategy
+        of [`torch.multiprocessing`][torch.multiprocessing]. Using the
+        `'file_descriptor'` strategy can exceed the open file limit with
+        many workers in which case use the default `copy=True` or the
+        `'file_system'` strategy.
+
+    Args:
+        input_file: Binary file of token IDs to memory-map.
+        block_size: Number of tokens in each sample.
+        dtype: Data type of the token IDs in the file.
+        copy: Copy samples out of the memory map into int64 tensors rather
+            than returning views of the memory map.
+    """
+
+    def __init__(
+        self,
+        input_file: pathlib.Path | str,
+        block_size: int,
+        dtype: Any = np.int32,
+        copy: bool = True,
+    ) -> None:
+        self.input_file = input_file
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+        self.copy = copy
+
+        samples = self.length_from_params(input_file, block_size, dtype)
+        self.buffer = np.memmap(
+            input_file,
+            dtype=self.dtype,
+            mode='r' if copy else 'c',
+            shape=(samples, block_size),
+        )
+
+    @classmethod
+    def length_from_params(
+        cls,
+        input_file: pathlib.Path | str,
+        block_size: int,
+        dtype: Any = np.int32,
+        **kwargs: Any,
+    ) -> int:
+        """Get the number of samples from the size of the file.
+
+        Trailing tokens that do not fill a complete sample are ignored.
+        Other keyword arguments of the constructor are ignored.
+        """
+        sample_bytes = np.dtype(dtype).itemsize * block_size
+        return os.path.getsize(input_file) // sample_bytes
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __getitem__(self, index: int) -> dict[str, torch.Tensor]:
+        if not self.copy:
+            return {'input_ids': torch.from_numpy(self.buffer[index])}
+        # Indexing the memory map returns a view so the copy made by astype
+        # ensures the tensor does not hold a reference to the memory map.
+        input_ids = self.buffer[index].astype(np.int64)
+        return {'input_ids': torch.from_numpy(input_ids)}
+
+    def __getitems__(
+        self,
+        indices: list[int],
+    ) -> list[dict[str, torch.Tensor]]:
+        if not self.copy:
+            return [self[index] for index in indices]
+        # Gather the batch directly into one int64 array, casting each row
+        # as it is copied out of the memory map, then return views into it.
+        input_ids = np.empty((len(indices), self.block_size), dtype=np.int64)
+        for i, index in enumerate(indices):
+            input_ids[i] = self.buffer[index]
+        return [{'input_ids': row} for row in torch.from_numpy(input_ids)]
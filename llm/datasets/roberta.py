@@ -93,6 +93,11 @@ class RoBERTaDataset(Dataset[Sample]):
             next_sentence_label=torch.tensor(0, dtype=torch.long),
         )
 
+    def preload(self) -> None:
+        """Load the shard data if it has not already been loaded."""
+        if not self.loaded:
+            self._lazy_load()
+
     def _lazy_load(self) -> None:
         with h5py.File(self.input_file, 'r') as f:
             input_ids = f['input_ids'][:]
@@ -2,15 +2,26 @@
 
 from __future__ import annotations
 
-import random
+import array
+import bisect
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from collections import OrderedDict
 from collections.abc import Iterator
 from collections.abc import Mapping
 from collections.abc import Sized
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import TypeVar
 
+import numpy as np
 import torch
 from torch.utils.data import Dataset
+from torch.utils.data import IterableDataset
 
 SampleType = TypeVar('SampleType', covariant=True)
 DatasetParams = tuple[tuple[Any, ...], Mapping[str, Any]]
@@ -30,8 +41,24 @@ class DistributedShardedDataset(Dataset[SampleType]):
     and so on. The length of an instance of this class as seen by a rank
     will be `(1 / world_size) * sum_of_samples_across_shards`.
 
-    This class also ensures only one shard is loaded at a time
+    By default, this class ensures only one shard is loaded at a time
     on a rank so the full dataset is never loaded into memory at once.
+    More recently used shards can be kept loaded with `shard_cache_size`
+    which avoids reloading a shard when access moves back and forth across a
+    shard boundary. This is most useful when shards are cheap to hold such as
+    memory-mapped shards
+    (e.g., [`ArrowDataset`][llm.datasets.arrow.ArrowDataset]).
+
+    Optionally, the next shard of the rank can be loaded in a background
+    thread while samples are read from the current shard so the shard
+    loading time is overlapped with training. When prefetching is enabled,
+    the next shard is held in memory in addition to the cached shards so
+    prefetching is disabled by default. Prefetching constructs the next
+    shard in the background thread. Shard types that defer reading their
+    data until first accessed (e.g.,
+    [`NvidiaBertDataset`][llm.datasets.bert.NvidiaBertDataset]) should
+    define a `preload()` method which reads the data so that the read is
+    also done in the background thread rather than on the first access.
 
     Warning:
         When building a [`DataLoader`][torch.utils.data.DataLoader] from a
@@ -49,11 +76,27 @@ class DistributedShardedDataset(Dataset[SampleType]):
         Samples at the end of the last shard will be dropped to ensure
         each rank sees an equal number of samples.
 
+    Note:
+        Next shard prefetching is disabled inside of
+        [`DataLoader`][torch.utils.data.DataLoader] worker processes
+        (i.e., when `num_workers > 0`) because each worker would otherwise
+        create its own thread pool. In this case, rely on the `prefetch_factor`
+        of the [`DataLoader`][torch.utils.data.DataLoader] instead.
+
     Todo:
-        * Next shard prefetching
-        * Sample index shuffling within a shard
         * Support shuffle shard order by epoch
 
+    Note:
+        The length of each shard is needed when this class is initialized.
+        If `dataset_type` defines a `length_from_params` classmethod, it
+        will be called with the same args and kwargs as the constructor to
+        read the length of the shard (e.g., from file metadata) without
+        instantiating the shard. Otherwise, each shard is instantiated once to
+        get its length. Shard lengths are read concurrently using
+        `metadata_workers` threads and can optionally be cached to disk in
+        `shard_lengths_cache_dir` so subsequent jobs using the same shards
+        skip reading the lengths entirely.
+
     Args:
         dataset_type: Dataset type that represents a single shard. This
             subtype of Dataset must be a map-style dataset. Iterable-style
@@ -65,7 +108,24 @@ class DistributedShardedDataset(Dataset[SampleType]):
         world_size: Number of ranks sharing the dataset.
         shuffle: Shuffle the shard order by the shard keys. The default
             (`False`) sorts the shards by shard key.
-        seed: Seed used for shuffling the shard order.
+        shuffle_samples: Shuffle the order of samples within each shard. The
+            samples of a shard that belong to this rank are permuted so
+            shuffling never changes which samples each rank sees. The order
+            changes with each epoch set by
+            [`set_epoch()`][llm.datasets.sharded.DistributedShardedDataset.set_epoch].
+        seed: Seed used for shuffling the shard and sample order.
+        prefetch: Load the next shard in a background thread once the current
+            shard has been loaded. If the shard has a `preload()` method, it
+            is also called in the background thread.
+        shard_cache_size: Maximum number of loaded shards to keep in memory,
+            including the current shard. The least recently used shard is
+            evicted first.
+        metadata_workers: Number of threads used to read the lengths of the
+            shards at initialization.
+        shard_lengths_cache_dir: Optional directory used to cache the shard
+            lengths. The cache file is keyed on a hash of `dataset_type` and
+            `shard_params` so the cache must be cleared if the contents of a
+            shard change without its parameters changing.
     """
 
     def __init__(
@@ -76,7 +136,12 @@ class DistributedShardedDataset(Dataset[SampleType]):
         rank: int,
         world_size: int,
         shuffle: bool = False,
+        shuffle_samples: bool = False,
         seed: int = 0,
+        prefetch: bool = False,
+        shard_cache_size: int = 1,
+        metadata_workers: int = 16,
+        shard_lengths_cache_dir: pathlib.Path | str | None = None,
     ) -> None:
         if not (0 <= rank < world_size):
             raise ValueError(
@@ -87,28 +152,43 @@ class DistributedShardedDataset(Dataset[SampleType]):
             raise ValueError(
                 'Parameters for at least one shard must be provided.',
             )
-
-        random.seed(seed)
+        if shard_cache_size < 1:
+            raise ValueError(
+                f'Got shard_cache_size={shard_cache_size} but at least one '
+                'shard must be cached.',
+            )
 
         self.dataset_type = dataset_type
         self.shard_params = shard_params
         self.rank = rank
         self.world_size = world_size
         self.shuffle = shuffle
-
+        self.shuffle_samples = shuffle_samples
+        self.seed = seed
+        self.epoch = 0
+        self.prefetch = prefetch
+        self.shard_cache_size = shard_cache_size
+
+        # Use a private generator rather than seeding the global random
+        # module which would affect any other users of the random module.
+        self._rng = np.random.default_rng(seed)
         shard_keys = sorted(shard_params.keys())
         if shuffle:
-            random.shuffle(shard_keys)
+            permutation = self._rng.permutation(len(shard_keys))
+            shard_keys = [shard_keys[i] for i in permutation.tolist()]
+
+        shard_lengths = self._get_shard_lengths(
+            metadata_workers,
+            shard_lengths_cache_dir,
+        )
 
         # Mapping of shard_key to (start_index, end_index)
         shard_indices: dict[str, tuple[int, int]] = {}
         index = 0
         for shard_key in shard_keys:
-            shard = self.load_shard(shard_key)
-            assert isinstance(shard, Sized)
-            shard_indices[shard_key] = (index, index + len(shard))
-            index += len(shard)
-            del shard
+            shard_length = shard_lengths[shard_key]
+            shard_indices[shard_key] = (index, index + shard_length)
+            index += shard_length
 
         # Drop indices from last shard to make divisible by world size
         last_shard_key = shard_keys[-1]
@@ -125,8 +205,57 @@ class DistributedShardedDataset(Dataset[SampleType]):
         assert len(shard_keys) == len(shard_indices) == len(shard_params)
         assert len(self) * self.world_size == self.total_samples
 
+        # Flattened shard boundaries in shard order so the shard containing
+        # a global index can be found with a binary search rather than a
+        # linear scan over the shards.
+        self._shard_keys_tuple = tuple(shard_keys)
+        self._shard_starts = array.array(
+            'q',
+            [shard_indices[k][0] for k in shard_keys],
+        )
+        self._shard_ends = array.array(
+            'q',
+            [shard_indices[k][1] for k in shard_keys],
+        )
+        # NumPy view of the shard ends for vectorized lookups of batches.
+        # Scalar lookups use bisect which has less overhead for one index.
+        self._shard_ends_np = np.frombuffer(self._shard_ends, dtype=np.int64)
+        self._rank_start = len(self) * self.rank
+        # Global index range and shard key of the shard last returned by
+        # rank_index_to_shard_index(). Sequential access almost always hits
+        # this range so the binary search can be skipped.
+        self._cached_shard_range: tuple[int, int, str | None] = (-1, -1, None)
+
         self._current_shard_key: str | None = None
         self._current_shard: Dataset[SampleType] | None = None
+        self._shard_cache: OrderedDict[str, Dataset[SampleType]] = (
+            OrderedDict()
+        )
+        # Start index within the current shard of the samples of this rank
+        # and the permutation of those samples if shuffle_samples is set.
+        self._current_shard_perm: tuple[int, np.ndarray[Any, Any]] | None = (
+            None
+        )
+
+        # The executor is created lazily on first use so that it is created
+        # in the process that actually reads samples.
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self._next_shard_key: str | None = None
+        self._next_shard_future: Future[Dataset[SampleType]] | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Loaded shards and the prefetch executor are runtime state which can
+        # be large or unpicklable so they are excluded when the dataset is
+        # sent to a DataLoader worker and will be recreated lazily.
+        state = self.__dict__.copy()
+        state['_current_shard_key'] = None
+        state['_current_shard'] = None
+        state['_current_shard_perm'] = None
+        state['_shard_cache'] = OrderedDict()
+        state['_prefetch_executor'] = None
+        state['_next_shard_key'] = None
+        state['_next_shard_future'] = None
+        return state
 
     def __len__(self) -> int:
         return self.total_samples // self.world_size
@@ -143,19 +272,236 @@ class DistributedShardedDataset(Dataset[SampleType]):
             self._current_shard_key is None
             or self._current_shard_key != shard_key
         ):
-            self._current_shard_key = shard_key
-            self._current_shard = self.load_shard(shard_key)
+            self._bind_shard(shard_key)
 
         # If self._current_shard_key is not None then self._current_shard
         # should never be None.
         assert self._current_shard is not None
 
+        if self._current_shard_perm is not None:
+            start, perm = self._current_shard_perm
+            shard_index = start + int(perm[shard_index - start])
+
         return self._current_shard[shard_index]
 
+    def __getitems__(self, rank_indices: list[int]) -> list[SampleType]:
+        """Get a batch of samples.
+
+        The [`DataLoader`][torch.utils.data.DataLoader] will use this method
+        in place of [`__getitem__`][llm.datasets.sharded.DistributedShardedDataset.__getitem__]
+        when fetching a batch. The indices are grouped by shard so each
+        shard is bound at most once per batch, and the group of indices is
+        forwarded to the shard's `__getitems__` if the shard supports it.
+
+        Args:
+            rank_indices: Dataset indices local to the rank.
+
+        Returns:
+            List of samples in the same order as `rank_indices`.
+        """  # noqa: E501
+        indices = np.asarray(rank_indices, dtype=np.int64)
+        if len(indices) == 0:
+            return []
+        if indices.min() < 0 or indices.max() >= len(self):
+            raise IndexError(
+                f'Requested sample indices {rank_indices} exceed dataset '
+                f'size of {len(self)} samples.',
+            )
+
+        global_indices = indices + self._rank_start
+        positions = np.searchsorted(
+            self._shard_ends_np,
+            global_indices,
+            side='right',
+        )
+        order = np.argsort(positions, kind='stable')
+        unique_positions, group_starts = np.unique(
+            positions[order],
+            return_index=True,
+        )
+        group_bounds = [*group_starts.tolist(), len(order)]
+
+        samples: list[Any] = [None] * len(indices)
+        for i, position in enumerate(unique_positions.tolist()):
+            group = order[group_bounds[i] : group_bounds[i + 1]]
+            shard_key = self._shard_keys_tuple[position]
+            if self._current_shard_key != shard_key:
+                self._bind_shard(shard_key)
+            assert self._current_shard is not None
+
+            shard = self._current_shard
+            local_indices = (
+                global_indices[group] - self._shard_starts[position]
+            )
+            if self._current_shard_perm is not None:
+                start, perm = self._current_shard_perm
+                local_indices = start + perm[local_indices - start]
+            shard_indices = local_indices.tolist()
+            if hasattr(shard, '__getitems__'):
+                group_samples = shard.__getitems__(shard_indices)
+            else:
+                group_samples = [shard[j] for j in shard_indices]
+
+            for j, sample in zip(group.tolist(), group_samples):
+                samples[j] = sample
+
+        return samples
+
+    def _bind_shard(self, shard_key: str) -> None:
+        prefetched = (
+            self._next_shard_future is not None
+            and self._next_shard_key == shard_key
+        )
+        if shard_key in self._shard_cache:
+            shard = self._shard_cache[shard_key]
+        elif prefetched:
+            assert self._next_shard_future is not None
+            shard = self._next_shard_future.result()
+        else:
+            shard = self.load_shard(shard_key)
+
+        if self._next_shard_future is not None and not prefetched:
+            # Stale prefetch (e.g., non-sequential access) so discard it.
+            self._next_shard_future.cancel()
+        self._next_shard_key = None
+        self._next_shard_future = None
+
+        # Least recently used shards are evicted here before the next shard
+        # is prefetched to bound the number of shards in memory.
+        self._shard_cache[shard_key] = shard
+        self._shard_cache.move_to_end(shard_key)
+        while len(self._shard_cache) > self.shard_cache_size:
+            self._shard_cache.popitem(last=False)
+        self._current_shard_key = shard_key
+        self._current_shard = shard
+        self._current_shard_perm = (
+            self._get_shard_permutation(shard_key)
+            if self.shuffle_samples
+            else None
+        )
+
+        next_shard_key = self._get_next_shard_key(shard_key)
+        if (
+            next_shard_key is not None
+            and next_shard_key not in self._shard_cache
+            and self._prefetch_enabled()
+        ):
+            self._submit_prefetch(next_shard_key)
+
+    def _get_shard_lengths(
+        self,
+        workers: int,
+        cache_dir: pathlib.Path | str | None,
+    ) -> dict[str, int]:
+        cache_file: pathlib.Path | None = None
+        if cache_dir is not None:
+            params = repr(
+                (
+                    self.dataset_type.__module__,
+                    self.dataset_type.__qualname__,
+                    sorted(self.shard_params.items()),
+                ),
+            )
+            digest = hashlib.sha256(params.encode()).hexdigest()
+            cache_file = (
+                pathlib.Path(cache_dir) / f'shard-lengths-{digest}.json'
+            )
+            if cache_file.is_file():
+                with open(cache_file) as f:
+                    return json.load(f)
+
+        shard_keys = list(self.shard_params.keys())
+        if workers > 1 and len(shard_keys) > 1:
+            with ThreadPoolExecutor(min(workers, len(shard_keys))) as pool:
+                lengths = list(pool.map(self._get_shard_length, shard_keys))
+        else:
+            lengths = [self._get_shard_length(key) for key in shard_keys]
+        shard_lengths = dict(zip(shard_keys, lengths))
+
+        if cache_file is not None:
+            # Write to a temporary file then rename so concurrent ranks
+            # never observe a partially written cache file.
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(shard_lengths, f)
+            os.replace(tmp_path, cache_file)
+
+        return shard_lengths
+
+    def _get_shard_length(self, shard_key: str) -> int:
+        args, kwargs = self.shard_params[shard_key]
+        length_from_params = getattr(
+            self.dataset_type,
+            'length_from_params',
+            None,
+        )
+        if length_from_params is not None:
+            return length_from_params(*args, **kwargs)
+
+        shard = self.load_shard(shard_key)
+        assert isinstance(shard, Sized)
+        return len(shard)
+
+    def _get_shard_permutation(
+        self,
+        shard_key: str,
+    ) -> tuple[int, np.ndarray[Any, Any]]:
+        # Only the samples of the shard belonging to this rank are permuted.
+        # The generator is seeded with the shard position rather than the
+        # hash of the key because string hashes vary between processes.
+        position = self._shard_keys_tuple.index(shard_key)
+        shard_start = self._shard_starts[position]
+        rank_end = self._rank_start + len(self)
+        start = max(shard_start, self._rank_start) - shard_start
+        end = min(self._shard_ends[position], rank_end) - shard_start
+        rng = np.random.default_rng((self.seed, position, self.epoch))
+        return (start, rng.permutation(max(end - start, 0)))
+
+    def _get_next_shard_key(self, shard_key: str) -> str | None:
+        # Only shards that overlap with the indices of this rank are needed.
+        rank_end = self._rank_start + len(self)
+        i = self._shard_keys_tuple.index(shard_key) + 1
+        while i < len(self._shard_keys_tuple):
+            if self._shard_starts[i] >= rank_end:
+                return None
+            if self._shard_starts[i] < self._shard_ends[i]:
+                return self._shard_keys_tuple[i]
+            i += 1
+        return None
+
+    def _prefetch_enabled(self) -> bool:
+        return self.prefetch and torch.utils.data.get_worker_info() is None
+
+    def _submit_prefetch(self, next_shard_key: str) -> None:
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        self._next_shard_key = next_shard_key
+        self._next_shard_future = self._prefetch_executor.submit(
+            self._prefetch_shard,
+            next_shard_key,
+        )
+
+    def _prefetch_shard(self, shard_key: str) -> Dataset[SampleType]:
+        shard = self.load_shard(shard_key)
+        # Shard types which lazily read their data can opt in to having the
+        # read done here in the background thread.
+        preload = getattr(shard, 'preload', None)
+        if preload is not None:
+            preload()
+        return shard
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch used to seed the order of samples within a shard."""
+        self.epoch = epoch
+        if self._current_shard_key is not None and self.shuffle_samples:
+            self._current_shard_perm = self._get_shard_permutation(
+                self._current_shard_key,
+            )
+
     def rank_index_to_global_index(self, rank_index: int) -> int:
         """Convert an index local to a rank to a global index."""
-        rank_start_index = len(self) * self.rank
-        return rank_start_index + rank_index
+        return self._rank_start + rank_index
 
     def rank_index_to_shard_index(self, rank_index: int) -> tuple[str, int]:
         """Convert an index local to a rank to a shard and shard index.
@@ -167,11 +513,18 @@ class DistributedShardedDataset(Dataset[SampleType]):
             Tuple of the shard key and the index within the shard that \
             `rank_index` corresponds to.
         """
-        global_index = self.rank_index_to_global_index(rank_index)
-        for shard_key in self.shard_keys:
-            shard_indices = self.shard_indices[shard_key]
-            if shard_indices[0] <= global_index < shard_indices[1]:
-                return (shard_key, global_index - shard_indices[0])
+        global_index = self._rank_start + rank_index
+        start, end, shard_key = self._cached_shard_range
+        if start <= global_index < end:
+            assert shard_key is not None
+            return (shard_key, global_index - start)
+
+        i = bisect.bisect_right(self._shard_ends, global_index)
+        if 0 <= global_index and i < len(self._shard_keys_tuple):
+            shard_key = self._shard_keys_tuple[i]
+            start = self._shard_starts[i]
+            self._cached_shard_range = (start, self._shard_ends[i], shard_key)
+            return (shard_key, global_index - start)
         raise AssertionError(
             f'Rank index {rank_index} for rank {self.rank} maps to global '
             f'index {global_index} which exceeds the total samples in the '
@@ -183,9 +536,126 @@ class DistributedShardedDataset(Dataset[SampleType]):
         return self.dataset_type(*args, **kwargs)
 
 
+class DistributedShardedIterableDataset(IterableDataset[SampleType]):
+    """Iterable dataset wrapper for sharded datasets in distributed settings.
+
+    An iterable-style alternative to
+    [`DistributedShardedDataset`][llm.datasets.sharded.DistributedShardedDataset]
+    for when samples are always read sequentially. Samples are partitioned
+    across ranks in the same way, but each shard of the rank is iterated
+    over in turn so no per-sample index to shard translation is needed.
+    Samples within a shard can optionally be shuffled.
+
+    When used with a [`DataLoader`][torch.utils.data.DataLoader] with
+    multiple workers, the samples of each shard are split evenly across the
+    workers.
+
+    Warning:
+        Samplers are not supported by iterable-style datasets so do not
+        pass a `sampler` or `shuffle=True` to the
+        [`DataLoader`][torch.utils.data.DataLoader]. As a consequence,
+        iteration cannot be resumed part way through an epoch like with the
+        [`ResumableSequentialSampler`][llm.datasets.sharded.ResumableSequentialSampler].
+
+    Args:
+        dataset_type: Dataset type that represents a single shard. This
+            subtype of Dataset must be a map-style dataset.
+        shard_params: Dictionary mapping shard keys to the parameters used
+            to initialize a `dataset_type` for the shard. The parameter type
+            is a tuple of args and kwargs.
+        rank: Rank of this process.
+        world_size: Number of ranks sharing the dataset.
+        shuffle: Shuffle the shard order by the shard keys. The default
+            (`False`) sorts the shards by shard key.
+        shuffle_samples: Shuffle the order of samples within each shard.
+            The order changes with each epoch set by
+            [`set_epoch()`][llm.datasets.sharded.DistributedShardedIterableDataset.set_epoch].
+        seed: Seed used for shuffling the shard and sample order.
+        kwargs: Additional keyword arguments to pass to
+            [`DistributedShardedDataset`][llm.datasets.sharded.DistributedShardedDataset]
+            (e.g., `prefetch`).
+    """
+
+    def __init__(
+        self,
+        dataset_type: type[Dataset[SampleType]],
+        shard_params: dict[str, DatasetParams],
+        *,
+        rank: int,
+        world_size: int,
+        shuffle: bool = False,
+        shuffle_samples: bool = False,
+        seed: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        self.dataset: DistributedShardedDataset[SampleType] = (
+            DistributedShardedDataset(
+                dataset_type,
+                shard_params,
+                rank=rank,
+                world_size=world_size,
+                shuffle=shuffle,
+                seed=seed,
+                **kwargs,
+            )
+        )
+        self.shuffle_samples = shuffle_samples
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def __iter__(self) -> Iterator[SampleType]:
+        dataset = self.dataset
+        rank_start = dataset.rank_index_to_global_index(0)
+        rank_end = rank_start + len(dataset)
+
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id = 0 if worker_info is None else worker_info.id
+        num_workers = 1 if worker_info is None else worker_info.num_workers
+
+        # Every worker uses the same seed so the sample order is identical
+        # across workers before being split between the workers.
+        rng = np.random.default_rng((self.seed, self.epoch))
+
+        for shard_key in dataset.shard_keys:
+            shard_start, shard_end = dataset.shard_indices[shard_key]
+            start = max(shard_start, rank_start) - shard_start
+            end = min(shard_end, rank_end) - shard_start
+            if start >= end:
+                continue
+
+            indices = np.arange(start, end)
+            if self.shuffle_samples:
+                rng.shuffle(indices)
+            indices = indices[worker_id::num_workers]
+
+            dataset._bind_shard(shard_key)
+            shard = dataset._current_shard
+            assert shard is not None
+            for index in indices.tolist():
+                yield shard[index]
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch used to seed the order of samples within a shard."""
+        self.epoch = epoch
+
+
 class ResumableSequentialSampler(torch.utils.data.Sampler[int]):
     """Resumable sequential sampler.
 
+    The sampler tracks the next index to be sampled so its state can be
+    saved with `state_dict()` and restored with `load_state_dict()`.
+
+    Note:
+        Iterating over the sampler advances its state so the sampler is
+        exhausted after one pass over the data. Call
+        [`reset()`][llm.datasets.sharded.ResumableSequentialSampler.reset]
+        before iterating again for the next epoch (e.g., when the same
+        [`DataLoader`][torch.utils.data.DataLoader] is reused across epochs
+        such as with `persistent_workers=True`).
+
     Args:
         data_source: Dataset to sample sequentially from.
         start_index: Index to resume sequential sampling from.
@@ -197,9 +667,26 @@ class ResumableSequentialSampler(torch.utils.data.Sampler[int]):
         self.index = start_index
 
     def __iter__(self) -> Iterator[int]:
-        while self.index < self.data_length:
-            yield self.index
-            self.index += 1
+        for index in range(self.index, self.data_length):
+            self.index = index + 1
+            yield index
 
     def __len__(self) -> int:
         return self.data_length - self.start_index
+
+    def reset(self, start_index: int = 0) -> None:
+        """Reset the sampler to start sampling from `start_index`."""
+        self.start_index = start_index
+        self.index = start_index
+
+    def state_dict(self) -> dict[str, int]:
+        """Get the state of the sampler.
+
+        Returns:
+            Dictionary containing the next index to be sampled.
+        """
+        return {'index': self.index}
+
+    def load_state_dict(self, state_dict: dict[str, int]) -> None:
+        """Restore the sampler state from `state_dict()`."""
+        self.reset(state_dict['index'])
@@ -33,7 +33,11 @@ def get_dataloader(
     sampler: torch.utils.data.Sampler[int],
     batch_size: int,
 ) -> torch.utils.data.DataLoader[Sample]:
-    """Create a dataloader from a sharded dataset."""
+    """Create a dataloader from a sharded dataset.
+
+    Batches are collated in the worker processes and pinned once per batch
+    so batches can be copied to the device with `non_blocking=True`.
+    """
     return torch.utils.data.DataLoader(
         dataset,
         batch_size=batch_size,
@@ -123,7 +123,11 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover
         for batch_index, batch in enumerate(dataloader):
             micro_step += 1
 
-            batch = Batch(*[t.cuda() for t in batch])  # noqa: PLW2901
+            # The data loader pins batches in host memory so the copies to
+            # the device can be asynchronous with respect to the host.
+            batch = Batch(  # noqa: PLW2901
+                *[t.cuda(non_blocking=True) for t in batch],
+            )
             optimizer.zero_grad()
             output = model(
                 input_ids=batch.input_ids,
@@ -187,7 +191,7 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover
         epoch += 1
 
         # Reset sampler for next epoch
-        sampler = ResumableSequentialSampler(dataset)
+        sampler.reset()
 
     writer.close()
 
@@ -47,6 +47,7 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     )
     parser.add_argument(
         '--validation_split_percentage',
+        type=float,
         default=5,
         help=(
             'The percentage of the train set used as validation set in case '
@@ -191,13 +192,46 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         '--preprocessing_num_workers',
         type=int,
         default=None,
-        help='The number of processes to use for the preprocessing.',
+        help=(
+            'The number of processes to use for the preprocessing. Each '
+            'process has a fixed startup cost so multiprocessing is most '
+            'beneficial for large datasets.'
+        ),
+    )
+    parser.add_argument(
+        '--preprocessing_batch_size',
+        type=int,
+        default=10000,
+        help=(
+            'Number of examples per batch passed to the tokenization and '
+            'text grouping functions during preprocessing.'
+        ),
+    )
+    parser.add_argument(
+        '--preprocessing_writer_batch_size',
+        type=int,
+        default=10000,
+        help=(
+            'Number of rows per write operation for the cache file writer '
+            'during preprocessing.'
+        ),
     )
     parser.add_argument(
         '--overwrite_cache',
         action='store_true',
         help='Overwrite the cached training and evaluation sets',
     )
+    parser.add_argument(
+        '--no_concatenate_texts',
+        action='store_true',
+        help=(
+            'Tokenize and split each text into blocks of at most block_size '
+            'tokens in a single pass rather than concatenating texts before '
+            'splitting into blocks. The last block of each text is padded '
+            'and empty texts are dropped. Not compatible with '
+            '--use_slow_tokenizer.'
+        ),
+    )
     parser.add_argument(
         '--no_keep_linebreaks',
         action='store_true',
@@ -238,6 +272,11 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         raise ValueError(
             'Need either a dataset name or a training/validation file.',
         )
+    if args.use_slow_tokenizer and args.no_concatenate_texts:
+        raise ValueError(
+            '--no_concatenate_texts requires a fast tokenizer so cannot be '
+            'used with --use_slow_tokenizer.',
+        )
     if args.train_file is not None:
         extension = args.train_file.split('.')[-1]
         if extension not in ['csv', 'json', 'txt']:
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import functools
 import itertools
 import logging
 from typing import Any
@@ -9,6 +8,8 @@ from typing import Union
 
 import accelerate
 import datasets
+import numpy as np
+import torch
 import transformers
 
 logger = logging.getLogger('llm.trainers.gpt')
@@ -45,17 +46,6 @@ def get_datasets(
     if dataset_name is not None:
         # Downloading and loading a dataset from the hub.
         raw_datasets = datasets.load_dataset(dataset_name, dataset_config_name)
-        if 'validation' not in raw_datasets.keys():
-            raw_datasets['validation'] = datasets.load_dataset(
-                dataset_name,
-                dataset_config_name,
-                split=f'train[:{validation_split_percentage}%]',
-            )
-            raw_datasets['train'] = datasets.load_dataset(
-                dataset_name,
-                dataset_config_name,
-                split=f'train[{validation_split_percentage}%:]',
-            )
     elif train_file is not None:
         data_files = {}
         dataset_args = {}
@@ -71,24 +61,24 @@ def get_datasets(
             data_files=data_files,
             **dataset_args,
         )
-        # If no validation data is there, validation_split_percentage will be
-        # used to divide the dataset.
-        if 'validation' not in raw_datasets.keys():
-            raw_datasets['validation'] = datasets.load_dataset(
-                extension,
-                data_files=data_files,
-                split=f'train[:{validation_split_percentage}%]',
-                **dataset_args,
-            )
-            raw_datasets['train'] = datasets.load_dataset(
-                extension,
-                data_files=data_files,
-                split=f'train[{validation_split_percentage}%:]',
-                **dataset_args,
-            )
     else:
         raise ValueError('One of dataset_name or train_file must be provided.')
 
+    # If no validation data is there, validation_split_percentage will be
+    # used to divide the dataset. The training split that was already loaded
+    # is split rather than loading the dataset again for each split.
+    if 'validation' not in raw_datasets.keys():
+        train_dataset = raw_datasets['train']
+        validation_size = int(
+            len(train_dataset) * float(validation_split_percentage) / 100,
+        )
+        raw_datasets['validation'] = train_dataset.select(
+            range(validation_size),
+        )
+        raw_datasets['train'] = train_dataset.select(
+            range(validation_size, len(train_dataset)),
+        )
+
     return raw_datasets
 
 
@@ -100,23 +90,39 @@ def preprocess_datasets(
     num_workers: int | None = None,
     overwrite_cache: bool = False,
     block_size: int | None = None,
+    tokenize_batch_size: int = 1000,
+    group_texts_batch_size: int = 1000,
+    writer_batch_size: int = 1000,
+    concatenate_texts: bool = True,
 ) -> DatasetT:
-    """Preprocessing the datasets."""
-    # First we tokenize all the texts.
-    column_names = raw_datasets['train'].column_names
-    text_column_name = 'text' if 'text' in column_names else column_names[0]
+    """Preprocessing the datasets.
 
-    def tokenize_function(examples: dict[str, Any]) -> Any:
-        return tokenizer(examples[text_column_name])
+    Larger batch sizes amortize the fixed per-batch overhead of the Python
+    function calls and cache file writes across more examples at the cost of
+    higher memory usage per process. Using `num_workers` processes has a fixed
+    startup cost per process so is most beneficial for large datasets.
 
-    with accelerator.main_process_first():
-        tokenized_datasets = raw_datasets.map(
-            tokenize_function,
-            batched=True,
-            num_proc=num_workers,
-            remove_columns=column_names,
-            load_from_cache_file=not overwrite_cache,
-            desc='Running tokenizer on dataset',
+    By default, texts are tokenized then concatenated and split into blocks
+    of `block_size` tokens with
+    [`group_texts()`][llm.trainers.gpt.data.group_texts] which requires two
+    passes over the dataset. If `concatenate_texts` is
+    `False`, each text is instead tokenized and split into blocks of at most
+    `block_size` tokens in a single pass. Texts are never concatenated so the
+    last block of each text is shorter than `block_size` and should be padded
+    by the collator, and no `labels` column is created (see
+    [`collate_padded_blocks()`][llm.trainers.gpt.data.collate_padded_blocks]).
+    Empty texts are dropped. This requires a fast tokenizer because slow
+    tokenizers return the overflowing tokens of each text in a separate key
+    rather than as additional rows.
+
+    Raises:
+        ValueError: If `concatenate_texts` is `False` and `tokenizer` is not
+            a fast tokenizer.
+    """
+    if not concatenate_texts and not tokenizer.is_fast:
+        raise ValueError(
+            'Tokenizing texts without concatenation requires a fast '
+            'tokenizer (backed by the 🤗 Tokenizers library).',
         )
 
     if block_size is None:
@@ -144,18 +150,76 @@ def preprocess_datasets(
 
     assert isinstance(block_size, int)
 
-    # Note that with `batched=True`, this map processes 1,000 texts together,
-    # so group_texts throws away a remainder for each of those groups of
-    # 1,000 texts. You can adjust that batch_size here but a higher value
-    # might be slower to preprocess.
+    column_names = raw_datasets['train'].column_names
+    text_column_name = 'text' if 'text' in column_names else column_names[0]
+
+    if not concatenate_texts:
+        # Tokenize and chunk each text into blocks of at most block_size in a
+        # single pass over the dataset. The last block of each text will be
+        # shorter than block_size so a collator that pads is needed.
+        def tokenize_and_chunk_function(examples: dict[str, Any]) -> Any:
+            result = tokenizer(
+                examples[text_column_name],
+                truncation=True,
+                max_length=block_size,
+                return_overflowing_tokens=True,
+                stride=0,
+            )
+            result.pop('overflow_to_sample_mapping', None)
+            # Empty texts (e.g., blank lines of a text file) produce empty
+            # blocks which would be collated into samples of only padding.
+            keep = [i for i, ids in enumerate(result['input_ids']) if ids]
+            return {k: [v[i] for i in keep] for k, v in result.items()}
+
+        with accelerator.main_process_first():
+            lm_datasets = raw_datasets.map(
+                tokenize_and_chunk_function,
+                batched=True,
+                batch_size=tokenize_batch_size,
+                writer_batch_size=writer_batch_size,
+                num_proc=num_workers,
+                remove_columns=column_names,
+                load_from_cache_file=not overwrite_cache,
+                desc=f'Tokenizing texts in chunks of {block_size}',
+            )
+        return lm_datasets
+
+    # First we tokenize all the texts.
+    def tokenize_function(examples: dict[str, Any]) -> Any:
+        return tokenizer(examples[text_column_name])
+
+    with accelerator.main_process_first():
+        tokenized_datasets = raw_datasets.map(
+            tokenize_function,
+            batched=True,
+            batch_size=tokenize_batch_size,
+            writer_batch_size=writer_batch_size,
+            num_proc=num_workers,
+            remove_columns=column_names,
+            load_from_cache_file=not overwrite_cache,
+            desc='Running tokenizer on dataset',
+        )
+
+    # Note that with `batched=True`, this map processes
+    # `group_texts_batch_size` texts together, so group_texts throws away a
+    # remainder for each of those groups of texts. A larger batch size
+    # throws away fewer tokens and reduces per-batch overhead but uses more
+    # memory.
+    #
+    # The block_size is passed via fn_kwargs, rather than binding it to the
+    # function with functools.partial, so the fingerprint datasets uses to
+    # find cached results explicitly includes the block_size.
     #
     # To speed up this part, we use multiprocessing. See the documentation of
     # the map method for more information:
     # https://huggingface.co/docs/datasets/package_reference/main_classes.html#datasets.Dataset.map  # noqa: E501
     with accelerator.main_process_first():
         lm_datasets = tokenized_datasets.map(
-            functools.partial(group_texts, block_size=block_size),
+            group_texts,
             batched=True,
+            fn_kwargs={'block_size': block_size},
+            batch_size=group_texts_batch_size,
+            writer_batch_size=writer_batch_size,
             num_proc=num_workers,
             load_from_cache_file=not overwrite_cache,
             desc=f'Grouping texts in chunks of {block_size}',
@@ -164,13 +228,37 @@ def preprocess_datasets(
     return lm_datasets
 
 
-def group_texts(examples: dict[str, Any], block_size: int) -> dict[str, Any]:
-    """Concatenates texts from dataset and generates chunks of block_size."""
-    # Concatenate all texts.
+def group_texts(
+    examples: dict[str, Any],
+    block_size: int,
+    copy_labels: bool = False,
+) -> dict[str, Any]:
+    """Concatenates texts from dataset and generates chunks of block_size.
+
+    Each column of the result is a `(num_blocks, block_size)` int32 array
+    rather than a list of lists. Token IDs fit in 32 bits so this halves the
+    size of the cached dataset compared to the int64 type that Python
+    integers are stored as.
+
+    The `labels` are the same as the `input_ids`. By default, the `labels`
+    share the array of `input_ids` rather than copying it because the
+    collators create new tensors from the rows anyway. Set `copy_labels` if
+    the array may be mutated in place.
+    """
+    # Concatenate all texts. Each column is flattened into a single array so
+    # the concatenation and chunking below are done by NumPy rather than by
+    # slicing Python lists. Every column has the same length per example so
+    # the total length is only computed once and used to preallocate each
+    # flattened array.
+    total_length = sum(len(x) for x in examples[next(iter(examples.keys()))])
     concatenated_examples = {
-        k: list(itertools.chain(*examples[k])) for k in examples.keys()
+        k: np.fromiter(
+            itertools.chain.from_iterable(v),
+            dtype=np.int32,
+            count=total_length,
+        )
+        for k, v in examples.items()
     }
-    total_length = len(concatenated_examples[next(iter(examples.keys()))])
     # We drop the small remainder, and if the total_length < block_size we
     # exclude this batch and return an empty dict. We could add padding if the
     # model supported it instead of this drop, you can customize this part to
@@ -178,8 +266,42 @@ def group_texts(examples: dict[str, Any], block_size: int) -> dict[str, Any]:
     total_length = (total_length // block_size) * block_size
     # Split by chunks of max_len.
     result = {
-        k: [t[i : i + block_size] for i in range(0, total_length, block_size)]
+        k: t[:total_length].reshape(-1, block_size)
         for k, t in concatenated_examples.items()
     }
-    result['labels'] = result['input_ids'].copy()
+    if copy_labels:
+        result['labels'] = result['input_ids'].copy()
+    else:
+        result['labels'] = result['input_ids']
     return result
+
+
+def collate_padded_blocks(
+    features: list[dict[str, Any]],
+    tokenizer: transformers.PreTrainedTokenizerBase,
+) -> dict[str, torch.Tensor]:
+    """Pad variable length blocks into a batch and create the labels.
+
+    The `labels` are the `input_ids` with the padding positions, found using
+    the `attention_mask`, set to -100 so they are ignored by the loss. Unlike
+    comparing against the `pad_token_id`, this does not also ignore real
+    tokens when the padding token is shared with another token (e.g., the
+    EOS token of GPT-2 tokenizers).
+
+    Example:
+        ```python
+        >>> import functools
+        >>> collate_fn = functools.partial(
+        ...     collate_padded_blocks, tokenizer=tokenizer,
+        ... )
+        ```
+    """
+    batch = tokenizer.pad(
+        features,
+        return_attention_mask=True,
+        return_tensors='pt',
+    )
+    labels = batch['input_ids'].clone()
+    labels[batch['attention_mask'] == 0] = -100
+    batch['labels'] = labels
+    return dict(batch)
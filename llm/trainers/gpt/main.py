@@ -20,6 +20,7 @@ Script modified from https://github.com/huggingface/transformers/blob/main/examp
 
 from __future__ import annotations
 
+import functools
 import json
 import logging
 import math
@@ -41,6 +42,7 @@ from llm.environment import log_environment
 from llm.initialize import initialize as initialize_environment
 from llm.timer import Timer
 from llm.trainers.gpt.arguments import parse_args
+from llm.trainers.gpt.data import collate_padded_blocks
 from llm.trainers.gpt.data import get_datasets
 from llm.trainers.gpt.data import preprocess_datasets
 from llm.trainers.gpt.model import load_model
@@ -100,6 +102,10 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover
         tokenizer=tokenizer,
         accelerator=accelerator,
         num_workers=args.preprocessing_num_workers,
+        tokenize_batch_size=args.preprocessing_batch_size,
+        group_texts_batch_size=args.preprocessing_batch_size,
+        writer_batch_size=args.preprocessing_writer_batch_size,
+        concatenate_texts=not args.no_concatenate_texts,
         overwrite_cache=args.overwrite_cache,
         block_size=args.block_size,
     )
@@ -107,15 +113,29 @@ def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover
     train_dataset = lm_datasets['train']
     eval_dataset = lm_datasets['validation']
 
+    if args.no_concatenate_texts:
+        # Blocks are variable length so they are padded when collated and the
+        # collator creates the labels, ignoring the padding tokens. Padding
+        # is found with the attention mask so reusing the EOS token as the
+        # padding token does not drop real EOS tokens from the loss.
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        data_collator = functools.partial(
+            collate_padded_blocks,
+            tokenizer=tokenizer,
+        )
+    else:
+        data_collator = default_data_collator
+
     train_dataloader = DataLoader(
         train_dataset,
         shuffle=True,
-        collate_fn=default_data_collator,
+        collate_fn=data_collator,
         batch_size=args.per_device_train_batch_size,
     )
     eval_dataloader = DataLoader(
         eval_dataset,
-        collate_fn=default_data_collator,
+        collate_fn=data_collator,
         batch_size=args.per_device_eval_batch_size,
     )
 
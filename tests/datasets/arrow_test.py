@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pathlib
+from typing import Any
+
+import pyarrow as pa
+import pytest
+
+from llm.datasets.arrow import arrow_shard_params
+from llm.datasets.arrow import ArrowDataset
+from llm.datasets.sharded import DistributedShardedDataset
+
+
+def write_arrow_shard(
+    filepath: pathlib.Path,
+    samples: int,
+    offset: int = 0,
+    batch_size: int = 7,
+) -> None:
+    table = pa.table(
+        {
+            'index': list(range(offset, offset + samples)),
+            'input_ids': [[i, i + 1] for i in range(offset, offset + samples)],
+        },
+    )
+    with pa.OSFile(str(filepath), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=batch_size)
+
+
+def test_arrow_dataset(tmp_path: pathlib.Path) -> None:
+    filepath = tmp_path / 'shard.arrow'
+    write_arrow_shard(filepath, 20)
+
+    assert ArrowDataset.length_from_params(filepath) == 20
+
+    dataset = ArrowDataset(filepath)
+    assert len(dataset) == 20
+    assert dataset[3] == {'index': 3, 'input_ids': [3, 4]}
+    assert [s['index'] for s in dataset.__getitems__([9, 2, 15])] == [9, 2, 15]
+
+    with pytest.raises(IndexError):
+        dataset[20]
+
+
+def test_sharded_arrow_dataset(tmp_path: pathlib.Path) -> None:
+    samples_per_shard = [10, 20, 30]
+    files = []
+    offset = 0
+    for i, num_samples in enumerate(samples_per_shard):
+        filepath = tmp_path / f'shard-{i}.arrow'
+        write_arrow_shard(filepath, num_samples, offset)
+        files.append(filepath)
+        offset += num_samples
+
+    dataset: DistributedShardedDataset[dict[str, Any]] = (
+        DistributedShardedDataset(
+            ArrowDataset,
+            arrow_shard_params(files),
+            rank=0,
+            world_size=1,
+            shard_cache_size=2,
+        )
+    )
+    assert len(dataset) == sum(samples_per_shard)
+    samples = dataset.__getitems__(list(range(len(dataset))))
+    assert [s['index'] for s in samples] == list(range(len(dataset)))
@@ -88,6 +88,9 @@ def test_dataset(data_dir: pathlib.Path) -> None:
 
     dataset = NvidiaBertDataset(shard)
     assert len(dataset) == NUM_SAMPLES
+    assert not dataset.loaded
+    dataset.preload()
+    assert dataset.loaded
     assert isinstance(dataset[0], Sample)
     assert isinstance(dataset[1], Sample)
 
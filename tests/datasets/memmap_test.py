@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pathlib
+
+import numpy as np
+import pytest
+import torch
+
+from llm.datasets.memmap import MemmapDataset
+from llm.datasets.sharded import DatasetParams
+from llm.datasets.sharded import DistributedShardedDataset
+
+
+def write_memmap_shard(
+    filepath: pathlib.Path,
+    samples: int,
+    block_size: int,
+    offset: int = 0,
+) -> None:
+    tokens = np.arange(offset, offset + samples * block_size, dtype=np.int32)
+    tokens.tofile(filepath)
+
+
+@pytest.mark.parametrize('trailing_tokens', (0, 3))
+def test_memmap_dataset(trailing_tokens: int, tmp_path: pathlib.Path) -> None:
+    filepath = tmp_path / 'shard.bin'
+    block_size = 8
+    write_memmap_shard(filepath, 10, block_size)
+    if trailing_tokens > 0:
+        with open(filepath, 'ab') as f:
+            np.zeros(trailing_tokens, dtype=np.int32).tofile(f)
+
+    assert MemmapDataset.length_from_params(filepath, block_size) == 10
+
+    dataset = MemmapDataset(filepath, block_size)
+    assert len(dataset) == 10
+
+    sample = dataset[2]
+    assert sample['input_ids'].dtype == torch.long
+    assert sample['input_ids'].tolist() == list(range(16, 24))
+
+    samples = dataset.__getitems__([3, 1])
+    assert samples[0]['input_ids'].tolist() == list(range(24, 32))
+    assert samples[1]['input_ids'].tolist() == list(range(8, 16))
+
+
+def test_sharded_memmap_dataset(tmp_path: pathlib.Path) -> None:
+    block_size = 4
+    samples_per_shard = [5, 6, 7]
+    params: dict[str, DatasetParams] = {}
+    offset = 0
+    for i, samples in enumerate(samples_per_shard):
+        filepath = tmp_path / f'shard-{i}.bin'
+        write_memmap_shard(filepath, samples, block_size, offset)
+        params[str(filepath)] = ((filepath,), {'block_size': block_size})
+        offset += samples * block_size
+
+    dataset: DistributedShardedDataset[dict[str, torch.Tensor]] = (
+        DistributedShardedDataset(
+            MemmapDataset,
+            params,
+            rank=0,
+            world_size=1,
+        )
+    )
+    dataloader = torch.utils.data.DataLoader(dataset, batch_size=4)
+    input_ids = torch.cat([batch['input_ids'] for batch in dataloader])
+    assert input_ids.flatten().tolist() == list(range(offset))
+
+
+def test_memmap_dataset_views(tmp_path: pathlib.Path) -> None:
+    filepath = tmp_path / 'shard.bin'
+    block_size = 8
+    write_memmap_shard(filepath, 10, block_size)
+
+    dataset = MemmapDataset(filepath, block_size, copy=False)
+    sample = dataset[2]
+    assert sample['input_ids'].dtype == torch.int32
+    assert sample['input_ids'].tolist() == list(range(16, 24))
+
+    # Modifying a view never modifies the file
+    sample['input_ids'][0] = -1
+    assert MemmapDataset(filepath, block_size)[2]['input_ids'][0] == 16
+
+    batch = torch.utils.data.default_collate(dataset.__getitems__([3, 1]))
+    assert batch['input_ids'].shape == (2, block_size)
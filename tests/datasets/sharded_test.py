@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import pathlib
+import pickle
+import random
+import threading
+from unittest import mock
+
 import pytest
 import torch
 
 from llm.datasets.sharded import DatasetParams
 from llm.datasets.sharded import DistributedShardedDataset
+from llm.datasets.sharded import DistributedShardedIterableDataset
 from llm.datasets.sharded import ResumableSequentialSampler
 
 
@@ -21,6 +28,15 @@ class SimpleDataset(torch.utils.data.Dataset[int]):
         return self.shard_offset + index
 
 
+class PreloadSimpleDataset(SimpleDataset):
+    def __init__(self, samples: int, shard_offset: int) -> None:
+        super().__init__(samples, shard_offset)
+        self.preload_thread: threading.Thread | None = None
+
+    def preload(self) -> None:
+        self.preload_thread = threading.current_thread()
+
+
 def simple_dataset_params(
     shard_samples: list[int],
 ) -> dict[str, DatasetParams]:
@@ -140,3 +156,337 @@ def test_sequential_sampler_resume() -> None:
     sampler = ResumableSequentialSampler(dataset, start_index=1)
     assert next(iter(sampler)) == 1
     assert len(sampler) == 9
+
+
+def test_rank_index_to_shard_index() -> None:
+    samples_per_shard = [13, 0, 17, 19, 23, 29]
+    params = simple_dataset_params(samples_per_shard)
+    ranks = 3
+
+    for rank in range(ranks):
+        dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+        )
+        # Check both sequential and reverse order access because the last
+        # shard range is cached between calls
+        indices = list(range(len(dataset)))
+        for rank_index in indices + indices[::-1]:
+            global_index = dataset.rank_index_to_global_index(rank_index)
+            shard_key, shard_index = dataset.rank_index_to_shard_index(
+                rank_index,
+            )
+            start, end = dataset.shard_indices[shard_key]
+            assert start <= global_index < end
+            assert shard_index == global_index - start
+
+        with pytest.raises(AssertionError):
+            dataset.rank_index_to_shard_index(dataset.total_samples)
+
+    # Last index of the last rank is always in the last shard
+    last_shard_key, _ = dataset.rank_index_to_shard_index(len(dataset) - 1)
+    assert last_shard_key == dataset.shard_keys[-1]
+
+
+@pytest.mark.parametrize('prefetch', (True, False))
+def test_next_shard_prefetch(prefetch: bool) -> None:
+    samples_per_shard = [10, 0, 20, 30]
+    params = simple_dataset_params(samples_per_shard)
+    dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+        SimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+        prefetch=prefetch,
+    )
+
+    assert dataset[0] == 0
+    if prefetch:
+        # Empty shards are skipped when finding the next shard
+        assert dataset._next_shard_key == 'shard-2'
+        assert dataset._next_shard_future is not None
+    else:
+        assert dataset._next_shard_future is None
+
+    samples = [dataset[i] for i in range(len(dataset))]
+    assert samples == list(range(sum(samples_per_shard)))
+    # No shard after the last shard to prefetch
+    assert dataset._next_shard_future is None
+
+    # Non-sequential access discards the stale prefetched shard
+    assert dataset[5] == 5
+    assert dataset[45] == 45
+
+
+def test_next_shard_prefetch_preload() -> None:
+    params = simple_dataset_params([10, 20])
+    dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+        PreloadSimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+        prefetch=True,
+    )
+
+    assert dataset[0] == 0
+    assert dataset._next_shard_future is not None
+    shard = dataset._next_shard_future.result()
+    assert isinstance(shard, PreloadSimpleDataset)
+    assert shard.preload_thread is not None
+    assert shard.preload_thread is not threading.current_thread()
+    # Shards loaded on the caller thread are not preloaded
+    assert isinstance(dataset._current_shard, PreloadSimpleDataset)
+    assert dataset._current_shard.preload_thread is None
+    assert dataset[10] == 10
+
+
+@pytest.mark.parametrize('ranks', (1, 3))
+def test_getitems(ranks: int) -> None:
+    samples_per_shard = [13, 17, 19, 23, 29]
+    params = simple_dataset_params(samples_per_shard)
+
+    for rank in range(ranks):
+        dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+        )
+        indices = list(range(len(dataset)))
+        random.Random(rank).shuffle(indices)
+
+        expected = [dataset[i] for i in indices]
+        assert dataset.__getitems__(indices) == expected
+        assert dataset.__getitems__([]) == []
+
+        with pytest.raises(IndexError):
+            dataset.__getitems__([0, len(dataset)])
+
+
+def test_getitems_dataloader() -> None:
+    samples_per_shard = [13, 17, 19, 23, 29]
+    params = simple_dataset_params(samples_per_shard)
+    dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+        SimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+    )
+    dataloader = torch.utils.data.DataLoader(dataset, batch_size=8)
+    samples = torch.cat(list(dataloader)).tolist()
+    assert samples == list(range(sum(samples_per_shard)))
+
+
+def test_shard_cache() -> None:
+    params = simple_dataset_params([10, 10, 10])
+    dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+        SimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+        prefetch=False,
+        shard_cache_size=2,
+    )
+
+    assert dataset[0] == 0
+    shard = dataset._current_shard
+    assert dataset[10] == 10
+    assert list(dataset._shard_cache) == ['shard-0', 'shard-1']
+    # Moving back to the first shard reuses the cached shard
+    assert dataset[9] == 9
+    assert dataset._current_shard is shard
+    assert dataset[20] == 20
+    assert list(dataset._shard_cache) == ['shard-0', 'shard-2']
+
+    with pytest.raises(ValueError):
+        DistributedShardedDataset(
+            SimpleDataset,
+            params,
+            rank=0,
+            world_size=1,
+            shard_cache_size=0,
+        )
+
+
+@pytest.mark.parametrize('metadata_workers', (1, 4))
+def test_shard_lengths_cache(
+    metadata_workers: int,
+    tmp_path: pathlib.Path,
+) -> None:
+    samples_per_shard = [13, 17, 19]
+    params = simple_dataset_params(samples_per_shard)
+
+    def _create() -> DistributedShardedDataset[int]:
+        return DistributedShardedDataset(
+            SimpleDataset,
+            params,
+            rank=0,
+            world_size=1,
+            metadata_workers=metadata_workers,
+            shard_lengths_cache_dir=tmp_path,
+        )
+
+    dataset = _create()
+    assert len(dataset) == sum(samples_per_shard)
+    assert len(list(tmp_path.glob('*.json'))) == 1
+
+    with mock.patch.object(
+        DistributedShardedDataset,
+        '_get_shard_length',
+    ) as mock_length:
+        cached_dataset = _create()
+        mock_length.assert_not_called()
+    assert cached_dataset.shard_indices == dataset.shard_indices
+
+
+def test_sequential_sampler_state() -> None:
+    dataset = range(10)
+    sampler = ResumableSequentialSampler(dataset)
+    iterator = iter(sampler)
+    assert [next(iterator) for _ in range(3)] == [0, 1, 2]
+
+    state = sampler.state_dict()
+    assert state == {'index': 3}
+
+    # Sampler is exhausted after a full pass until reset
+    assert list(iterator) == list(range(3, 10))
+    assert list(sampler) == []
+    sampler.reset()
+    assert list(sampler) == list(dataset)
+
+    resumed = ResumableSequentialSampler(dataset)
+    resumed.load_state_dict(state)
+    assert list(resumed) == list(range(3, 10))
+    assert len(resumed) == 7
+
+
+@pytest.mark.parametrize('shuffle_samples', (True, False))
+def test_iterable_dataset(shuffle_samples: bool) -> None:
+    samples_per_shard = [13, 17, 19, 23, 29]
+    params = simple_dataset_params(samples_per_shard)
+    ranks = 3
+
+    for rank in range(ranks):
+        mapped = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+        )
+        dataset = DistributedShardedIterableDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+            shuffle_samples=shuffle_samples,
+        )
+        assert len(dataset) == len(mapped)
+
+        expected = [mapped[i] for i in range(len(mapped))]
+        samples = list(dataset)
+        if shuffle_samples:
+            assert samples != expected
+            assert sorted(samples) == expected
+            # Order is deterministic for an epoch and changes between epochs
+            assert list(dataset) == samples
+            dataset.set_epoch(1)
+            assert list(dataset) != samples
+        else:
+            assert samples == expected
+
+
+def test_iterable_dataset_workers() -> None:
+    samples_per_shard = [13, 17, 19]
+    params = simple_dataset_params(samples_per_shard)
+    dataset = DistributedShardedIterableDataset(  # type: ignore[var-annotated]
+        SimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+        shuffle_samples=True,
+    )
+    dataloader = torch.utils.data.DataLoader(
+        dataset,
+        batch_size=4,
+        num_workers=2,
+    )
+    samples = torch.cat(list(dataloader)).tolist()
+    assert sorted(samples) == list(range(sum(samples_per_shard)))
+
+
+def test_shuffle_does_not_seed_global_random() -> None:
+    params = simple_dataset_params([10] * 10)
+    state = random.getstate()
+    orders = []
+    for _ in range(2):
+        dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=0,
+            world_size=1,
+            shuffle=True,
+            seed=42,
+        )
+        orders.append(dataset.shard_keys)
+    assert random.getstate() == state
+    assert orders[0] == orders[1]
+    assert orders[0] != sorted(params)
+
+
+def test_shuffle_samples() -> None:
+    samples_per_shard = [13, 17, 19, 23, 29]
+    params = simple_dataset_params(samples_per_shard)
+    ranks = 3
+
+    for rank in range(ranks):
+        ordered = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+        )
+        dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+            SimpleDataset,
+            params,
+            rank=rank,
+            world_size=ranks,
+            shuffle_samples=True,
+        )
+        expected = [ordered[i] for i in range(len(ordered))]
+        indices = list(range(len(dataset)))
+
+        samples = [dataset[i] for i in indices]
+        # Shuffling only reorders the samples seen by the rank
+        assert samples != expected
+        assert sorted(samples) == expected
+        assert dataset.__getitems__(indices) == samples
+
+        dataset.set_epoch(1)
+        epoch_samples = [dataset[i] for i in indices]
+        assert epoch_samples != samples
+        assert sorted(epoch_samples) == expected
+
+
+def test_pickle_excludes_loaded_shards() -> None:
+    samples_per_shard = [10, 20, 30]
+    params = simple_dataset_params(samples_per_shard)
+    dataset = DistributedShardedDataset(  # type: ignore[var-annotated]
+        SimpleDataset,
+        params,
+        rank=0,
+        world_size=1,
+        prefetch=True,
+    )
+    # Load the first shard and start prefetching the second
+    assert dataset[0] == 0
+    assert dataset._prefetch_executor is not None
+
+    restored = pickle.loads(pickle.dumps(dataset))
+    assert restored._current_shard is None
+    assert restored._prefetch_executor is None
+    assert len(restored._shard_cache) == 0
+    assert [restored[i] for i in range(len(restored))] == list(range(60))
+    # Original dataset is unaffected
+    assert dataset._current_shard is not None